@@ -0,0 +1,416 @@
+"""Benchmarks for the bot.
+
+replay: re-run bot methods against recorded WebDriver traces, without a
+browser. Record a trace during a normal run:
+
+    DRIVER_TRACE=debug_outputs/trace-{host}.json python main.py
+
+then replay it (CPU only, sleeps are virtual):
+
+    python benchmark.py replay debug_outputs/trace-linux.do.json --method read_posts
+
+A segment fails if the code issues a command the trace does not contain,
+so any change that adds WebDriver round-trips is caught. Commands that are
+no longer issued are reported as skipped (use --strict to fail on those).
+--max-commands-per-topic sets a regression budget for the reading loops.
+
+presets: run the full bot against a local stand-in forum once per Chrome
+launch preset and report peak memory and CPU seconds per topic of the
+browser processes (Linux, needs Chrome). By default each preset runs with
+and without the stand-in's in-app router, so the time saved per topic list
+navigation is reported too:
+
+    python benchmark.py presets --topics 3
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import http.server
+import urllib.parse
+from contextlib import contextmanager
+
+# Keep benchmarks self-contained before main reads its environment
+for name in ('DRIVER_TRACE', 'QUARANTINE_FILE', 'RUN_DEADLINE', 'LOG_JSON_FILE', 'CHROME_CACHE_DIR'):
+    os.environ.pop(name, None)
+
+from main import CHROME_PRESETS, CommandStats, DiscourseAutoRead, DriverProxy, ReplayDriver, logger
+
+METHODS = ['read_posts', 'read_new_posts', 'random_like', 'tunehub_checkin']
+
+
+class VirtualClock:
+    """Stand-in for time.sleep/time/monotonic that follows the recorded timeline"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.epoch = time.time()
+
+    def sleep(self, seconds):
+        self.now += max(seconds, 0)
+
+    def time(self):
+        return self.epoch + self.now
+
+    def monotonic(self):
+        return self.now
+
+    def advance_to(self, seconds):
+        self.now = max(self.now, seconds)
+
+
+@contextmanager
+def virtual_time(clock):
+    saved = time.sleep, time.time, time.monotonic
+    time.sleep, time.time, time.monotonic = clock.sleep, clock.time, clock.monotonic
+    try:
+        yield
+    finally:
+        time.sleep, time.time, time.monotonic = saved
+
+
+def replay_segment(trace, events, method, strict, command_stats=None):
+    """Run one bot method against one recorded segment"""
+    clock = VirtualClock()
+    replay = ReplayDriver(events, strict=strict, clock=clock)
+    bot = DiscourseAutoRead(trace['site'])
+    segment_stats = CommandStats()
+    observers = [segment_stats] if command_stats is None else [command_stats, segment_stats]
+    bot.driver = DriverProxy(replay, observers=observers)
+
+    error = None
+    cpu_started = time.process_time()
+    with virtual_time(clock):
+        try:
+            # Budget and quarantine as they were when the segment was recorded
+            if events and 'state' in events[0]:
+                bot.restore_replay_state(events[0]['state'])
+            getattr(bot, method)()
+        except Exception as e:
+            error = e
+    cpu = time.process_time() - cpu_started
+
+    error = replay.mismatch or error
+    leftover = replay.remaining
+    ok = error is None and not (strict and leftover)
+    return {
+        'per_topic': segment_stats.per_topic(bot.stats['unread_topics'] + bot.stats['new_topics']),
+        'recorded': sum(1 for e in events if 'cmd' in e),
+        'replayed': replay.replayed,
+        'skipped': replay.skipped + leftover,
+        'cpu_ms': cpu * 1000,
+        'virtual_s': clock.now,
+        'ok': ok,
+        'error': error,
+    }
+
+
+def run_replay(args):
+    failed = False
+    rows = []
+    command_stats = CommandStats()
+    methods = args.method or METHODS
+    for method in methods:
+        trace, segments, parents = ReplayDriver.load_segments(args.trace, method, args.occurrence)
+        os.environ.update(trace.get('env', {}))
+        for index, events in enumerate(segments):
+            # A segment nested in another replayed one (random_like inside
+            # read_posts) is already in the table through its parent
+            nested = parents[index] & set(methods)
+            result = replay_segment(trace, events, method, args.strict, None if nested else command_stats)
+            if (args.max_commands_per_topic and result['per_topic']
+                    and result['per_topic'] > args.max_commands_per_topic):
+                result['ok'] = False
+                logger.error("%s #%s: %s commands per topic exceeds budget of %s",
+                             method, index, result['per_topic'], args.max_commands_per_topic)
+            failed = failed or not result['ok']
+            rows.append((method, index, result))
+            if result['error'] is not None:
+                logger.error("%s #%s: %s", method, index, result['error'])
+
+    if not rows:
+        print("No matching segments in trace.")
+        return 1
+
+    print(f"{'method':<16}{'#':>4}{'recorded':>10}{'replayed':>10}{'skipped':>9}"
+          f"{'cmd/topic':>11}{'cpu ms':>10}{'virtual s':>11}  status")
+    for method, index, r in rows:
+        status = 'ok' if r['ok'] else 'FAIL'
+        per_topic = '-' if r['per_topic'] is None else r['per_topic']
+        print(f"{method:<16}{index:>4}{r['recorded']:>10}{r['replayed']:>10}{r['skipped']:>9}"
+              f"{per_topic:>11}{r['cpu_ms']:>10.1f}{r['virtual_s']:>11.1f}  {status}")
+
+    if args.table:
+        print()
+        print("\n".join(command_stats.format_table()))
+    return 1 if failed else 0
+
+
+class StandInForum:
+    """Topic state for the local stand-in of a Discourse forum"""
+
+    # Minimal stand-in for Discourse's router: require('discourse/lib/url')
+    # .default.routeTo fetches the page, re-renders #main-outlet and only then
+    # updates the URL, like an Ember transition finishing
+    ROUTER_SCRIPT = """
+        window.require = function (name) {
+            if (name !== 'discourse/lib/url') {
+                throw new Error('Could not find module ' + name);
+            }
+            return {default: {routeTo: function (path) {
+                fetch(path).then(function (response) {
+                    return response.text();
+                }).then(function (html) {
+                    var page = new DOMParser().parseFromString(html, 'text/html');
+                    document.getElementById('main-outlet').innerHTML =
+                        page.getElementById('main-outlet').innerHTML;
+                    history.pushState({}, '', path);
+                });
+            }}};
+        };
+    """
+
+    def __init__(self, unread_topics, new_topics, posts_per_topic=30, router=True):
+        self.router = router
+        self.unread = list(range(1, unread_topics + 1))
+        self.new = list(range(1001, 1001 + new_topics))
+        self.posts_per_topic = posts_per_topic
+        self.read = set()
+        # Stand-in for the Ember bundle: ~2 MB of script that builds some heap on boot
+        functions = ''.join(
+            f"function m{i}(a){{return a.map(function(x){{return x*{i}+'{'v' * 40}';}});}}\n"
+            for i in range(20000)
+        )
+        self.bundle = (functions + "window.__store = [];"
+                       "for (var i = 0; i < 200000; i++) { window.__store.push({id: i, t: 'topic-' + i}); }").encode()
+
+    def page(self, content):
+        return (
+            "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Stand-in Forum</title>"
+            "<script src='/assets/app.js'></script>"
+            f"{'<script>' + self.ROUTER_SCRIPT + '</script>' if self.router else ''}</head><body>"
+            "<div id='current-user'>bench</div>"
+            f"<div id='main-outlet'>{content}</div></body></html>"
+        ).encode()
+
+    def topic_list(self, path):
+        rows = []
+        if path == '/unread':
+            for topic_id in self.unread:
+                if topic_id not in self.read:
+                    rows.append(
+                        f"<tr class='topic-list-item'><td class='main-link'>"
+                        f"<a class='title' href='/t/topic-{topic_id}/{topic_id}'>Topic {topic_id}</a></td>"
+                        f"<td><a class='badge badge-notification unread-posts' "
+                        f"href='/t/topic-{topic_id}/{topic_id}/1'>1</a></td></tr>"
+                    )
+        elif path == '/new':
+            for topic_id in self.new:
+                if topic_id not in self.read:
+                    rows.append(
+                        f"<tr class='topic-list-item'><td class='main-link'>"
+                        f"<a class='title' href='/t/topic-{topic_id}/{topic_id}'>Topic {topic_id}</a></td></tr>"
+                    )
+        return self.page(f"<div id='list-area'><table class='topic-list'>{''.join(rows)}</table></div>")
+
+    def topic(self, topic_id):
+        self.read.add(topic_id)
+        like = (
+            "<div class='discourse-reactions-reaction-button' style='width:24px;height:24px' "
+            "onclick=\"this.innerHTML='<svg class=d-icon-d-liked width=16 height=16></svg>'\">"
+            "<svg class='d-icon-d-unliked' width='16' height='16'></svg></div>"
+        )
+        text = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 12
+        posts = ''.join(f"<article class='post'><p>{text}</p>{like}</article>" for _ in range(self.posts_per_topic))
+        return self.page(f"<h1>Topic {topic_id}</h1>{posts}")
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        forum = self.server.forum
+        path = urllib.parse.urlparse(self.path).path
+        content_type = 'text/html; charset=utf-8'
+        cache_control = 'no-cache'
+        if path == '/session/current.json':
+            body = json.dumps({'current_user': {'username': 'bench'}}).encode()
+            content_type = 'application/json'
+        elif path == '/assets/app.js':
+            body = forum.bundle
+            content_type = 'application/javascript'
+            cache_control = 'max-age=31536000, immutable'
+        elif path in ('/', '/unread', '/new'):
+            body = forum.topic_list(path)
+        elif path.startswith('/t/'):
+            body = forum.topic(int(path.split('/')[3]))
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', cache_control)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ProcessSampler(threading.Thread):
+    """Sample memory and CPU time of this process's descendants (the browser)"""
+
+    def __init__(self, interval=0.5):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.cpu_ticks = {}  # pid -> latest utime+stime of that process alone
+        self.peak_rss = 0
+        self.peak_pss = 0
+
+    @staticmethod
+    def read_stat(pid):
+        with open(f'/proc/{pid}/stat') as f:
+            # Fields after the parenthesised command name, starting at `state`
+            fields = f.read().rsplit(')', 1)[1].split()
+        ppid = int(fields[1])
+        # utime+stime only: each descendant is sampled under its own pid, and
+        # cutime/cstime would count exited renderers a second time in Chrome
+        ticks = int(fields[11]) + int(fields[12])
+        return ppid, ticks, int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+
+    @staticmethod
+    def read_pss(pid):
+        try:
+            with open(f'/proc/{pid}/smaps_rollup') as f:
+                for line in f:
+                    if line.startswith('Pss:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+
+    def sample(self):
+        procs = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    procs[int(entry)] = self.read_stat(entry)
+                except (OSError, ValueError, IndexError):
+                    continue
+
+        descendants, frontier = set(), {os.getpid()}
+        while frontier:
+            frontier = {pid for pid, (ppid, _, _) in procs.items() if ppid in frontier} - descendants
+            descendants |= frontier
+
+        rss = pss = 0
+        for pid in descendants:
+            _, ticks, pid_rss = procs[pid]
+            self.cpu_ticks[pid] = max(self.cpu_ticks.get(pid, 0), ticks)
+            rss += pid_rss
+            pss += self.read_pss(pid)
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_pss = max(self.peak_pss, pss)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self.sample()
+        self.stopped.set()
+        self.join()
+
+    @property
+    def cpu_seconds(self):
+        return sum(self.cpu_ticks.values()) / os.sysconf('SC_CLK_TCK')
+
+
+def run_presets(args):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.update({
+        'MAX_TOPICS': str(args.topics),
+        'MAX_NEW_TOPICS': str(args.topics),
+        'HEADLESS': 'false' if args.headed else 'true',
+    })
+
+    modes = ['spa', 'full'] if args.navigation == 'both' else [args.navigation]
+    rows = []
+    for preset in args.preset or list(CHROME_PRESETS):
+        for mode in modes:
+            random.seed(args.seed)
+            server.forum = StandInForum(args.topics, args.topics, router=(mode == 'spa'))
+            os.environ['CHROME_PRESET'] = preset
+            bot = DiscourseAutoRead(url, cookie_str='_t=bench')
+
+            sampler = ProcessSampler()
+            started = time.monotonic()
+            sampler.start()
+            try:
+                bot.start()
+            except Exception as e:
+                logger.error("Preset %s (%s) failed: %s", preset, mode, e)
+            finally:
+                sampler.stop()
+
+            topics = bot.stats['unread_topics'] + bot.stats['new_topics']
+            rows.append((preset, mode, topics, sampler, bot.stats['navigation'], time.monotonic() - started))
+
+    server.shutdown()
+
+    print(f"{'preset':<10}{'router':<8}{'topics':>7}{'peak RSS MB':>13}{'peak PSS MB':>13}{'CPU s':>9}"
+          f"{'CPU s/topic':>13}{'spa nav s':>11}{'full nav s':>12}{'wall s':>9}")
+    averages = {}
+    for preset, mode, topics, sampler, navigation, wall in rows:
+        per_topic = f"{sampler.cpu_seconds / topics:.2f}" if topics else '-'
+        nav = {}
+        for kind in ('spa', 'full'):
+            if kind in navigation:
+                nav[kind] = navigation[kind]['total_s'] / navigation[kind]['count']
+                averages.setdefault(preset, {})[kind] = nav[kind]
+        print(f"{preset:<10}{mode:<8}{topics:>7}{sampler.peak_rss / 1e6:>13.1f}{sampler.peak_pss / 1e6:>13.1f}"
+              f"{sampler.cpu_seconds:>9.1f}{per_topic:>13}"
+              f"{nav.get('spa', float('nan')):>11.2f}{nav.get('full', float('nan')):>12.2f}{wall:>9.1f}")
+
+    for preset, nav in averages.items():
+        if 'spa' in nav and 'full' in nav:
+            print(f"{preset}: in-app navigation saved {nav['full'] - nav['spa']:.2f}s per topic list load")
+    return 0 if all(row[2] for row in rows) else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for DiscourseAutoRead")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    replay = commands.add_parser('replay', help="replay WebDriver traces without a browser")
+    replay.add_argument('trace', help="trace file written with DRIVER_TRACE")
+    replay.add_argument('--method', action='append', choices=METHODS,
+                        help="bot method to replay (repeatable, default: all)")
+    replay.add_argument('--occurrence', type=int, help="replay only the N-th recorded call (0-based)")
+    replay.add_argument('--strict', action='store_true', help="also fail when recorded commands go unused")
+    replay.add_argument('--max-commands-per-topic', type=float,
+                        help="fail reading segments that issue more commands per topic")
+    replay.add_argument('--table', action='store_true', help="print commands by calling bot method")
+    replay.set_defaults(run=run_replay)
+
+    presets = commands.add_parser('presets', help="compare Chrome launch presets on a local stand-in forum")
+    presets.add_argument('--preset', action='append', choices=sorted(CHROME_PRESETS),
+                         help="preset to run (repeatable, default: all)")
+    presets.add_argument('--topics', type=int, default=3, help="unread and new topics to read per preset")
+    presets.add_argument('--seed', type=int, default=1, help="random seed, so presets do the same work")
+    presets.add_argument('--headed', action='store_true', help="run with a visible window (e.g. under Xvfb)")
+    presets.add_argument('--navigation', choices=['both', 'spa', 'full'], default='both',
+                         help="run with the stand-in router (spa), without it (full), or both")
+    presets.set_defaults(run=run_presets)
+
+    args = parser.parse_args()
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,74 +1,1154 @@
 import os
+import re
+import sys
+import json
+import queue
+import atexit
 import random
+import functools
 import time
 import logging
+import logging.handlers
 import requests
 import urllib.parse
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 import undetected_chromedriver as uc
+from selenium.common import exceptions as selenium_exceptions
 from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 
 # Load environment variables
 load_dotenv()
 
+# Pass as `extra=` on messages logged from polling loops to rate-limit them
+THROTTLED = {'throttle': True}
+
+
+class RepeatFilter(logging.Filter):
+    """Collapse repeats of THROTTLED messages within a time window"""
+
+    def __init__(self, window):
+        super().__init__()
+        self.window = window
+        self.last_emitted = {}  # (logger, level, template) -> monotonic time
+        self.suppressed = {}    # (logger, level, template) -> skipped count
+
+    def filter(self, record):
+        if not getattr(record, 'throttle', False):
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        last = self.last_emitted.get(key)
+        if last is not None and now - last < self.window:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return False
+        self.last_emitted[key] = now
+        skipped = self.suppressed.pop(key, 0)
+        if skipped:
+            record.msg = f"{record.msg} [{skipped} similar suppressed]"
+        return True
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records unformatted; the writer thread builds the message"""
+
+    def prepare(self, record):
+        return record
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format each record as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging():
+    """Route log records through a queue to a background writer thread"""
+    console = logging.StreamHandler()
+    if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+        console.setFormatter(JsonLinesFormatter())
+    else:
+        console.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    handlers = [console]
+    
+    json_file = os.getenv('LOG_JSON_FILE')
+    if json_file:
+        os.makedirs(os.path.dirname(json_file) or '.', exist_ok=True)
+        file_handler = logging.FileHandler(json_file, encoding='utf-8')
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+    
+    log_queue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(RepeatFilter(float(os.getenv('LOG_REPEAT_WINDOW', 10))))
+    
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(queue_handler)
+    
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Drain the queue before the interpreter exits
+    atexit.register(listener.stop)
+
+
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
+class SessionBridge:
+    """Keep a pooled requests.Session and the browser cookie jar in sync"""
+
+    DEFAULT_USER_AGENT = (
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36'
+    )
+
+    def __init__(self, url, pool_size=4):
+        self.url = url.rstrip('/')
+        self.host = urllib.parse.urlparse(self.url).hostname or ''
+        self.session = requests.Session()
+        # Keep-alive connection pool shared by all browser-free requests
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # Until pull_from_driver copies the real one, look like the Chrome we launch
+        self.session.headers['User-Agent'] = self.DEFAULT_USER_AGENT
+        # Per-call latency metrics: operation name -> list of seconds
+        self.latencies = {}
+
+    @contextmanager
+    def _measure(self, operation):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latencies.setdefault(operation, []).append(time.perf_counter() - start)
+
+    def _matches_host(self, domain):
+        domain = (domain or self.host).lstrip('.')
+        return self.host == domain or self.host.endswith(f".{domain}")
+
+    def _drop_cookie(self, name):
+        """Remove every cookie called `name` that would be sent to this host"""
+        for cookie in list(self.session.cookies):
+            if cookie.name == name and self._matches_host(cookie.domain):
+                self.session.cookies.clear(cookie.domain, cookie.path, cookie.name)
+
+    def load_cookie_string(self, cookie_str):
+        """Load a raw `name=value; ...` cookie string into the session jar"""
+        count = 0
+        with self._measure('load_cookie_string'):
+            for chunk in cookie_str.split(';'):
+                if '=' in chunk:
+                    name, value = chunk.strip().split('=', 1)
+                    if name and value:
+                        self.session.cookies.set(name, value, domain=self.host, path='/')
+                        count += 1
+        return count
+
+    def push_to_driver(self, driver):
+        """Copy session cookies into the browser (driver must be on the site)"""
+        pushed = 0
+        with self._measure('push_to_driver'):
+            for cookie in self.session.cookies:
+                if not self._matches_host(cookie.domain):
+                    continue
+                browser_cookie = {
+                    'name': cookie.name,
+                    'value': cookie.value,
+                    'path': cookie.path or '/',
+                    'secure': bool(cookie.secure),
+                }
+                if cookie.expires:
+                    browser_cookie['expiry'] = int(cookie.expires)
+                try:
+                    driver.add_cookie(browser_cookie)
+                    pushed += 1
+                except Exception as e:
+                    logger.warning("Failed to add cookie %s: %s", cookie.name, e)
+        return pushed
+
+    def pull_from_driver(self, driver):
+        """Copy browser cookies and User-Agent into the session"""
+        with self._measure('pull_from_driver'):
+            cookies = driver.get_cookies()
+            for c in cookies:
+                # The browser may report `.host` where load_cookie_string used
+                # `host`; drop every copy so the stale one is not sent first
+                self._drop_cookie(c['name'])
+                self.session.cookies.set(
+                    c['name'],
+                    c['value'],
+                    domain=c.get('domain') or self.host,
+                    path=c.get('path', '/'),
+                    secure=c.get('secure', False),
+                    expires=c.get('expiry'),
+                )
+            # cf_clearance is bound to the browser's User-Agent
+            user_agent = driver.execute_script("return navigator.userAgent")
+            if user_agent:
+                self.session.headers['User-Agent'] = user_agent
+        return len(cookies)
+
+    def check_session(self, timeout=10):
+        """Check login state via /session/current.json without a browser.
+
+        Returns False only when Discourse itself answers that nobody is
+        logged in (JSON 404, or JSON 200 without `current_user`); anything
+        else (challenge pages, WAF/crawler blocks, network errors) is
+        inconclusive and returns None.
+        """
+        try:
+            with self._measure('check_session'):
+                response = self.session.get(
+                    f"{self.url}/session/current.json",
+                    headers={'Accept': 'application/json', 'X-Requested-With': 'XMLHttpRequest'},
+                    timeout=timeout
+                )
+        except requests.RequestException as e:
+            logger.warning("Session check failed: %s", e)
+            return None
+        
+        if response.headers.get('cf-mitigated') or 'application/json' not in response.headers.get('Content-Type', ''):
+            logger.info("Session check got a non-JSON response (HTTP %s), skipping.", response.status_code)
+            return None
+        try:
+            data = response.json()
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        if response.status_code == 200:
+            return bool(data.get('current_user'))
+        if response.status_code == 404:
+            return False
+        return None
+
+    def metrics_summary(self):
+        """Return call count and latency (ms) per bridge operation"""
+        summary = {}
+        for operation, samples in self.latencies.items():
+            summary[operation] = {
+                'calls': len(samples),
+                'avg_ms': round(sum(samples) / len(samples) * 1000, 1),
+                'max_ms': round(max(samples) * 1000, 1),
+            }
+        return summary
+
+    def log_metrics(self):
+        for operation, m in sorted(self.metrics_summary().items()):
+            logger.info(
+                "Session bridge %s: %s calls, avg %sms, max %sms",
+                operation, m['calls'], m['avg_ms'], m['max_ms']
+            )
+
+    def close(self):
+        self.session.close()
+
+
+# Chrome flags shared by every launch preset
+BASE_CHROME_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-infobars',
+    '--disable-extensions',
+    '--disable-popup-blocking',
+    '--lang=zh-CN,zh,en-US,en',
+]
+
+# Selected with CHROME_PRESET; `lean` trades headroom for memory and CPU.
+# uc.Chrome always appends --window-size=1920,1080 and --start-maximized after
+# our arguments, so a smaller viewport is applied after launch instead.
+CHROME_PRESETS = {
+    'default': {
+        'args': [],
+        'window_size': None,
+    },
+    'lean': {
+        'args': [
+            '--renderer-process-limit=2',
+            '--disable-background-networking',
+            '--disable-component-update',
+            '--disable-default-apps',
+            '--disable-sync',
+            '--disable-breakpad',
+            '--disable-client-side-phishing-detection',
+            '--disable-domain-reliability',
+            '--disable-hang-monitor',
+            '--no-first-run',
+            '--no-default-browser-check',
+            '--metrics-recording-only',
+            '--mute-audio',
+            '--disable-features=Translate,OptimizationHints,MediaRouter,BackForwardCache,'
+            'InterestFeedContentSuggestions,AutofillServerCommunication',
+            '--js-flags=--max-old-space-size=256',
+        ],
+        'window_size': (1280, 720),
+    },
+}
+
+
+def build_chrome_options(preset='default', headless=True, extra_args=()):
+    """Build ChromeOptions for a launch preset"""
+    if preset not in CHROME_PRESETS:
+        raise ValueError(f"Unknown CHROME_PRESET '{preset}', expected one of {sorted(CHROME_PRESETS)}")
+    
+    options = uc.ChromeOptions()
+    if headless:
+        options.add_argument('--headless=new')
+    for arg in BASE_CHROME_ARGS + CHROME_PRESETS[preset]['args'] + list(extra_args):
+        options.add_argument(arg)
+    # Return from driver.get at DOMContentLoaded; callers wait for the elements they need
+    options.page_load_strategy = os.getenv('PAGE_LOAD_STRATEGY', 'eager')
+    return options
+
+
+def prune_cache_dir(path, max_bytes):
+    """Delete least recently used cache files until the directory fits in max_bytes"""
+    files = []
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            file_path = os.path.join(root, name)
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            total += st.st_size
+            # Chrome rebuilds its index if entries disappear, but keep the index itself
+            if name == 'index' or 'index-dir' in root:
+                continue
+            # Order by mtime only: restoring the directory from actions/cache (tar)
+            # resets every atime, and relatime keeps Chrome's reads from fixing it
+            files.append((st.st_mtime, st.st_size, file_path))
+    
+    removed = 0
+    for _, size, file_path in sorted(files):
+        if total - removed <= max_bytes:
+            break
+        try:
+            os.remove(file_path)
+            removed += size
+        except OSError:
+            continue
+    return total, removed
+
+
+class RunBudget:
+    """Global wall-clock deadline for a run, split across sites and phases"""
+
+    def __init__(self, total_seconds=0, reserve_seconds=0):
+        self.total = total_seconds  # 0 disables the deadline
+        self.reserve = reserve_seconds  # kept back for TuneHub and the notification
+        self.started = time.monotonic()
+        self.decisions = []
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        if not self.total:
+            return float('inf')
+        return self.total - self.elapsed()
+
+    def record(self, scope, event, **detail):
+        """Store a budget decision in the run stats"""
+        self.decisions.append({'t': round(self.elapsed(), 1), 'scope': scope, 'event': event, **detail})
+        if self.total:
+            logger.info("Budget [%s] %s: %s", scope, event, detail)
+
+    def allocate_site(self, name, sites_left):
+        """Give the next site an equal share of the time left; unused time rolls over"""
+        seconds = (self.remaining() - self.reserve) / max(sites_left, 1)
+        self.record(name, 'site_allocated', seconds=round(seconds) if self.total else None)
+        return SiteBudget(self, name, seconds)
+
+    def summary(self):
+        return {
+            'deadline_s': self.total,
+            'reserve_s': self.reserve,
+            'elapsed_s': round(self.elapsed(), 1),
+            'decisions': self.decisions,
+        }
+
+
+class SiteBudget:
+    """Per-site slice of a RunBudget, divided into reading phases"""
+
+    # Assumed cost of one topic (list reload + reading) until one is measured
+    DEFAULT_TOPIC_SECONDS = 60
+
+    def __init__(self, run, name, seconds):
+        self.run = run
+        self.name = name
+        self.deadline = time.monotonic() + seconds
+        self.phase = None
+        self.phase_deadline = self.deadline
+        self.topic_estimate = self.DEFAULT_TOPIC_SECONDS
+        self.topics_measured = 0
+        self.wound_down = []
+
+    def begin_phase(self, phase, share):
+        """Give a phase `share` of the site time left; unused time rolls over"""
+        now = time.monotonic()
+        self.phase = phase
+        self.phase_deadline = now + max(0, self.deadline - now) * share
+        if self.run.total:
+            self.run.record(self.name, 'phase_started', phase=phase, seconds=round(self.phase_deadline - now))
+
+    def can_start_topic(self):
+        """Check whether another topic is expected to fit before the phase deadline"""
+        left = self.phase_deadline - time.monotonic()
+        if left >= self.topic_estimate:
+            return True
+        self.wound_down.append(self.phase)
+        self.run.record(
+            self.name, 'phase_wound_down', phase=self.phase,
+            left_s=round(max(left, 0)), topic_estimate_s=round(self.topic_estimate)
+        )
+        return False
+
+    def topic_time_cap(self, default):
+        """Cap reading time so an in-progress topic ends by the phase deadline"""
+        return max(0, min(default, self.phase_deadline - time.monotonic()))
+
+    def record_topic(self, seconds):
+        """Feed a measured topic duration into the running estimate"""
+        if self.topics_measured == 0:
+            self.topic_estimate = seconds
+        else:
+            self.topic_estimate = 0.7 * self.topic_estimate + 0.3 * seconds
+        self.topics_measured += 1
+
+    def snapshot(self):
+        """Budget state relative to now, for trace segments"""
+        now = time.monotonic()
+        return {
+            'total_s': self.run.total,
+            'phase': self.phase,
+            'site_left_s': None if self.deadline == float('inf') else round(self.deadline - now, 3),
+            'phase_left_s': None if self.phase_deadline == float('inf') else round(self.phase_deadline - now, 3),
+            'topic_estimate_s': self.topic_estimate,
+            'topics_measured': self.topics_measured,
+        }
+
+    def restore(self, state):
+        """Rebuild the budget from a snapshot (used by replays)"""
+        now = time.monotonic()
+        self.run.total = state['total_s']
+        self.phase = state['phase']
+        self.deadline = float('inf') if state['site_left_s'] is None else now + state['site_left_s']
+        self.phase_deadline = float('inf') if state['phase_left_s'] is None else now + state['phase_left_s']
+        self.topic_estimate = state['topic_estimate_s']
+        self.topics_measured = state['topics_measured']
+
+
+class TopicQuarantine:
+    """Per-topic failure accounting with retry backoff and quarantine"""
+
+    # /t/<id>[/<post>] or /t/<slug>/<id>[/<post>]; a numeric first segment is the ID
+    TOPIC_ID_RE = re.compile(r'/t/(?:(\d+)(?=[/?#]|$)|[^/?#]+/(\d+))')
+
+    def __init__(self, site, max_failures=3, backoff=30, path=None, ttl_days=7):
+        self.site = site
+        self.max_failures = max_failures
+        self.backoff = backoff
+        self.path = path
+        self.ttl = ttl_days * 86400
+        # topic key -> {'url', 'failures', 'lost_s', 'retry_at', 'quarantined_at'}
+        self.topics = {}
+        self.lost_this_run = 0.0
+        self.load()
+
+    @classmethod
+    def topic_key(cls, href):
+        """Use the numeric topic ID when the URL has one"""
+        match = cls.TOPIC_ID_RE.search(href or '')
+        return (match.group(1) or match.group(2)) if match else (href or 'unknown')
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f).get(self.site, {})
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to load quarantine file %s: %s", self.path, e)
+            return
+        now = time.time()
+        for key, entry in saved.items():
+            if now - entry.get('quarantined_at', 0) < self.ttl:
+                self.topics[key] = entry
+        if self.topics:
+            logger.info("Loaded %s quarantined topics from %s", len(self.topics), self.path)
+
+    def save(self):
+        """Persist quarantined topics so later runs skip them too"""
+        if not self.path:
+            return
+        try:
+            data = {}
+            if os.path.exists(self.path):
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+            data[self.site] = {
+                key: entry for key, entry in self.topics.items() if entry.get('quarantined_at')
+            }
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to save quarantine file %s: %s", self.path, e)
+
+    def snapshot(self):
+        """Entries with their timestamps relative to now, for trace segments"""
+        now = time.time()
+        return {
+            key: {k: round(v - now, 3) if k in ('retry_at', 'quarantined_at') else v for k, v in entry.items()}
+            for key, entry in self.topics.items()
+        }
+
+    def restore(self, entries):
+        """Replace the entries with a snapshot (used by replays)"""
+        now = time.time()
+        self.topics = {
+            key: {k: now + v if k in ('retry_at', 'quarantined_at') else v for k, v in entry.items()}
+            for key, entry in entries.items()
+        }
+
+    def should_skip(self, key):
+        """Skip quarantined topics and topics still waiting out their backoff"""
+        entry = self.topics.get(key)
+        if not entry:
+            return False
+        return bool(entry.get('quarantined_at')) or time.time() < entry.get('retry_at', 0)
+
+    def record_failure(self, key, url, seconds):
+        entry = self.topics.setdefault(key, {'url': url, 'failures': 0, 'lost_s': 0.0})
+        entry['failures'] += 1
+        entry['lost_s'] = round(entry['lost_s'] + seconds, 1)
+        self.lost_this_run += seconds
+        
+        if entry['failures'] >= self.max_failures:
+            entry['quarantined_at'] = time.time()
+            logger.warning(
+                "Topic %s quarantined after %s failures (%ss lost)",
+                key, entry['failures'], entry['lost_s']
+            )
+        else:
+            delay = self.backoff * 2 ** (entry['failures'] - 1)
+            entry['retry_at'] = time.time() + delay
+            logger.info("Topic %s failed (%s/%s), retry in %ss", key, entry['failures'], self.max_failures, delay)
+
+    def record_success(self, key):
+        entry = self.topics.get(key)
+        if entry and not entry.get('quarantined_at'):
+            del self.topics[key]
+
+    def summary(self):
+        return {
+            'quarantined': [
+                {'topic': key, 'url': entry['url'], 'failures': entry['failures'], 'lost_s': entry['lost_s']}
+                for key, entry in self.topics.items() if entry.get('quarantined_at')
+            ],
+            'lost_s': round(self.lost_this_run, 1),
+        }
+
+
+def trace_value(value):
+    """Convert a WebDriver argument/result into its JSON trace form"""
+    if isinstance(value, (ElementProxy, ReplayElement)):
+        return {'__element__': value.id}
+    if isinstance(value, (list, tuple)):
+        return [trace_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: trace_value(v) for k, v in value.items()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+def redact_command(command, args, result):
+    """Keep typed credentials and cookie values out of trace files"""
+    if command == 'send_keys':
+        args = ['***']
+    elif command == 'add_cookie':
+        args = [{**args[0], 'value': '***'}]
+    elif command == 'get_cookies' and isinstance(result, list):
+        result = [{**c, 'value': '***'} for c in result]
+    return args, result
+
+
+class DriverProxy:
+    """Forward WebDriver calls to a driver and report each command to observers.
+
+    Observers implement on_command(target, command, args, result, error,
+    started, elapsed) and on_mark(event, name). The wrapped driver may be a
+    real browser or a ReplayDriver.
+    """
+
+    def __init__(self, driver, observers=()):
+        self._driver = driver
+        self.observers = list(observers)
+        self._element_count = 0
+
+    def _wrap(self, value):
+        if isinstance(value, list):
+            return [self._wrap(v) for v in value]
+        if isinstance(value, (WebElement, ReplayElement)):
+            self._element_count += 1
+            return ElementProxy(self, value, self._element_count)
+        return value
+
+    def _invoke(self, target, command, func, *args):
+        started = time.perf_counter()
+        raw_args = [a._element if isinstance(a, ElementProxy) else a for a in args]
+        try:
+            result = self._wrap(func(*raw_args))
+        except Exception as e:
+            self._notify(target, command, args, None, e, started)
+            raise
+        self._notify(target, command, args, result, None, started)
+        return result
+
+    def _notify(self, target, command, args, result, error, started):
+        elapsed = time.perf_counter() - started
+        for observer in self.observers:
+            observer.on_command(target, command, list(args), result, error, started, elapsed)
+
+    def mark(self, event, name):
+        """Mark entering/leaving a replayable segment of bot code"""
+        for observer in self.observers:
+            observer.on_mark(event, name)
+        if hasattr(self._driver, 'mark'):
+            self._driver.mark(event, name)
+
+    def get(self, url):
+        return self._invoke('driver', 'get', self._driver.get, url)
+
+    def refresh(self):
+        return self._invoke('driver', 'refresh', self._driver.refresh)
+
+    def find_element(self, by=By.ID, value=None):
+        return self._invoke('driver', 'find_element', self._driver.find_element, by, value)
+
+    def find_elements(self, by=By.ID, value=None):
+        return self._invoke('driver', 'find_elements', self._driver.find_elements, by, value)
+
+    def execute_script(self, script, *args):
+        return self._invoke('driver', 'execute_script', self._driver.execute_script, script, *args)
+
+    @property
+    def title(self):
+        return self._invoke('driver', 'title', lambda: self._driver.title)
+
+    @property
+    def current_url(self):
+        return self._invoke('driver', 'current_url', lambda: self._driver.current_url)
+
+    def get_cookies(self):
+        return self._invoke('driver', 'get_cookies', self._driver.get_cookies)
+
+    def add_cookie(self, cookie):
+        return self._invoke('driver', 'add_cookie', self._driver.add_cookie, cookie)
+
+    def set_page_load_timeout(self, seconds):
+        return self._invoke('driver', 'set_page_load_timeout', self._driver.set_page_load_timeout, seconds)
+
+    def set_window_size(self, width, height):
+        return self._invoke('driver', 'set_window_size', self._driver.set_window_size, width, height)
+
+    def quit(self):
+        return self._invoke('driver', 'quit', self._driver.quit)
+
+    def __getattr__(self, name):
+        # Anything not proxied above goes straight to the driver, untracked
+        return getattr(self._driver, name)
+
+
+class ElementProxy:
+    """WebElement stand-in that routes element commands through its DriverProxy"""
+
+    def __init__(self, proxy, element, element_id):
+        self._proxy = proxy
+        self._element = element
+        self.id = element_id
+
+    def _invoke(self, command, func, *args):
+        return self._proxy._invoke(self.id, command, func, *args)
+
+    def click(self):
+        return self._invoke('click', self._element.click)
+
+    def clear(self):
+        return self._invoke('clear', self._element.clear)
+
+    def send_keys(self, *value):
+        return self._invoke('send_keys', self._element.send_keys, *value)
+
+    def is_displayed(self):
+        return self._invoke('is_displayed', self._element.is_displayed)
+
+    def is_enabled(self):
+        return self._invoke('is_enabled', self._element.is_enabled)
+
+    def get_attribute(self, name):
+        return self._invoke('get_attribute', self._element.get_attribute, name)
+
+    def find_element(self, by=By.ID, value=None):
+        return self._invoke('find_element', self._element.find_element, by, value)
+
+    def find_elements(self, by=By.ID, value=None):
+        return self._invoke('find_elements', self._element.find_elements, by, value)
+
+    @property
+    def text(self):
+        return self._invoke('text', lambda: self._element.text)
+
+    @property
+    def location(self):
+        return self._invoke('location', lambda: self._element.location)
+
+
+class TraceRecorder:
+    """DriverProxy observer that writes every command, with timings, to a trace file"""
+
+    def __init__(self, path, site, env=None, state=None):
+        self.path = path
+        self.site = site
+        self.env = env or {}
+        self.state = state  # optional callable; its result is stored on each segment
+        self.started = time.perf_counter()
+        self.events = []
+        self.accounting = None  # command accounting attached at the end of the run
+
+    def on_command(self, target, command, args, result, error, started, elapsed):
+        args, result = redact_command(command, trace_value(args), trace_value(result))
+        event = {
+            't': round(started - self.started, 3),
+            'ms': round(elapsed * 1000, 2),
+            'target': target,
+            'cmd': command,
+            'args': args,
+            'result': result,
+        }
+        if error is not None:
+            event['error'] = [type(error).__name__, str(error).splitlines()[0] if str(error) else '']
+        self.events.append(event)
+
+    def on_mark(self, event, name):
+        entry = {'t': round(time.perf_counter() - self.started, 3), 'mark': event, 'name': name}
+        if event == 'enter':
+            # Reseed so the segment's random choices can be reproduced on replay
+            entry['seed'] = random.randrange(2 ** 32)
+            random.seed(entry['seed'])
+            if self.state:
+                entry['state'] = self.state()
+        self.events.append(entry)
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': 1,
+                    'site': self.site,
+                    'env': self.env,
+                    'accounting': self.accounting,
+                    'events': self.events,
+                }, f)
+            logger.info("WebDriver trace saved to %s (%s commands)", self.path,
+                        sum(1 for e in self.events if 'cmd' in e))
+        except OSError as e:
+            logger.warning("Failed to save WebDriver trace %s: %s", self.path, e)
+
+
+class CommandStats:
+    """DriverProxy observer that accounts commands by calling bot method"""
+
+    # Segments whose commands count towards the per-topic budget
+    READING_SEGMENTS = ('read_posts', 'read_new_posts')
+
+    def __init__(self):
+        self.rows = {}  # (method, command) -> {'calls', 'seconds', 'bytes'}
+        self.reading_depth = 0
+        self.reading_commands = 0
+
+    @staticmethod
+    def caller():
+        """Name of the innermost DiscourseAutoRead method on the stack"""
+        frame = sys._getframe(2)
+        while frame is not None:
+            # Lambdas and decorator wrappers can see `self` too; only count real methods
+            name = frame.f_code.co_name
+            if hasattr(DiscourseAutoRead, name) and isinstance(frame.f_locals.get('self'), DiscourseAutoRead):
+                return name
+            frame = frame.f_back
+        return '<other>'
+
+    def on_command(self, target, command, args, result, error, started, elapsed):
+        # Approximate wire size from the JSON form of arguments and result
+        size = len(json.dumps(trace_value(args), default=str)) + len(json.dumps(trace_value(result), default=str))
+        row = self.rows.setdefault((self.caller(), command), {'calls': 0, 'seconds': 0.0, 'bytes': 0})
+        row['calls'] += 1
+        row['seconds'] += elapsed
+        row['bytes'] += size
+        if self.reading_depth:
+            self.reading_commands += 1
+
+    def on_mark(self, event, name):
+        if name in self.READING_SEGMENTS:
+            self.reading_depth += 1 if event == 'enter' else -1
+
+    @property
+    def total(self):
+        return sum(row['calls'] for row in self.rows.values())
+
+    def per_topic(self, topics):
+        """Commands issued while reading topic lists and topics, per topic read"""
+        return round(self.reading_commands / topics, 1) if topics else None
+
+    def table(self):
+        """Rows sorted by total latency, slowest first"""
+        rows = [
+            {'method': method, 'command': command, 'calls': row['calls'],
+             'total_ms': round(row['seconds'] * 1000, 1),
+             'avg_ms': round(row['seconds'] * 1000 / row['calls'], 2),
+             'bytes': row['bytes']}
+            for (method, command), row in self.rows.items()
+        ]
+        return sorted(rows, key=lambda r: r['total_ms'], reverse=True)
+
+    def format_table(self, limit=None):
+        lines = [f"{'method':<26}{'command':<22}{'calls':>7}{'total ms':>11}{'avg ms':>9}{'bytes':>10}"]
+        for r in self.table()[:limit]:
+            lines.append(
+                f"{r['method']:<26}{r['command']:<22}{r['calls']:>7}"
+                f"{r['total_ms']:>11.1f}{r['avg_ms']:>9.2f}{r['bytes']:>10}"
+            )
+        return lines
+
+
+class ReplayMismatch(Exception):
+    """The bot issued a command the trace does not contain"""
+
+
+class ReplayDriver:
+    """Serve WebDriver responses from a recorded trace without a browser.
+
+    Commands must arrive in recorded order. With strict=False, recorded
+    commands the code no longer issues are skipped (and counted), but an
+    extra or different command still fails. The first mismatch is kept in
+    `mismatch`, because the bot swallows most exceptions.
+    """
+
+    def __init__(self, events, strict=False, clock=None):
+        self.events = events
+        self.position = 0
+        self.strict = strict
+        self.clock = clock  # optional object with advance_to(seconds)
+        self.replayed = 0
+        self.skipped = 0
+        self.mismatch = None
+        self._t0 = events[0]['t'] if events else 0
+
+    @staticmethod
+    def load_segments(path, name, occurrence=None):
+        """Return the trace header, the event lists of each `name` segment and
+        the names of the segments each one is nested in"""
+        with open(path, encoding='utf-8') as f:
+            trace = json.load(f)
+        segments, parents, current, depth, open_marks = [], [], None, 0, []
+        for event in trace['events']:
+            if event.get('mark') == 'enter' and event['name'] == name:
+                if depth == 0:
+                    current = []
+                    parents.append(set(open_marks))
+                depth += 1
+            # Marks come from try/finally, so an exit always closes the innermost segment
+            if event.get('mark') == 'enter':
+                open_marks.append(event['name'])
+            elif event.get('mark') == 'exit' and open_marks:
+                open_marks.pop()
+            if current is not None:
+                current.append(event)
+            if event.get('mark') == 'exit' and event['name'] == name and depth:
+                depth -= 1
+                if depth == 0:
+                    segments.append(current)
+                    current = None
+        if occurrence is not None:
+            segments = segments[occurrence:occurrence + 1]
+            parents = parents[occurrence:occurrence + 1]
+        return trace, segments, parents
+
+    @property
+    def remaining(self):
+        return sum(1 for e in self.events[self.position:] if 'cmd' in e)
+
+    def _fail(self, message):
+        if self.mismatch is None:
+            self.mismatch = ReplayMismatch(message)
+        raise self.mismatch
+
+    def _advance(self, matches):
+        """Move to the next event accepted by `matches`, skipping stale commands if allowed"""
+        if self.mismatch is not None:
+            raise self.mismatch
+        for index in range(self.position, len(self.events)):
+            event = self.events[index]
+            if matches(event):
+                self.skipped += sum(1 for e in self.events[self.position:index] if 'cmd' in e)
+                self.position = index + 1
+                return event
+            if self.strict or 'mark' in event:
+                break
+        return None
+
+    def _next(self, target, command, args):
+        args, _ = redact_command(command, trace_value(list(args)), None)
+        event = self._advance(
+            lambda e: e.get('target') == target and e.get('cmd') == command and e.get('args') == args
+        )
+        if event is None:
+            expected = self.events[self.position] if self.position < len(self.events) else None
+            self._fail(f"unexpected {target}.{command}{tuple(args)}; trace has {expected}")
+        self.replayed += 1
+        if self.clock:
+            self.clock.advance_to(event['t'] - self._t0 + event['ms'] / 1000)
+        if 'error' in event:
+            name, message = event['error']
+            error = getattr(selenium_exceptions, name, None)
+            if isinstance(error, type) and issubclass(error, Exception):
+                raise error(message)
+            raise WebDriverException(f"{name}: {message}")
+        return self._materialize(event['result'])
+
+    def _materialize(self, value):
+        if isinstance(value, list):
+            return [self._materialize(v) for v in value]
+        if isinstance(value, dict):
+            if set(value) == {'__element__'}:
+                return ReplayElement(self, value['__element__'])
+            return {k: self._materialize(v) for k, v in value.items()}
+        return value
+
+    def mark(self, event, name):
+        entry = self._advance(lambda e: e.get('mark') == event and e.get('name') == name)
+        if entry is None:
+            self._fail(f"segment {event} '{name}' not in trace")
+        if 'seed' in entry:
+            random.seed(entry['seed'])
+
+    def get(self, url):
+        return self._next('driver', 'get', [url])
+
+    def refresh(self):
+        return self._next('driver', 'refresh', [])
+
+    def find_element(self, by=By.ID, value=None):
+        return self._next('driver', 'find_element', [by, value])
+
+    def find_elements(self, by=By.ID, value=None):
+        return self._next('driver', 'find_elements', [by, value])
+
+    def execute_script(self, script, *args):
+        return self._next('driver', 'execute_script', [script, *args])
+
+    @property
+    def title(self):
+        return self._next('driver', 'title', [])
+
+    @property
+    def current_url(self):
+        return self._next('driver', 'current_url', [])
+
+    def get_cookies(self):
+        return self._next('driver', 'get_cookies', [])
+
+    def add_cookie(self, cookie):
+        return self._next('driver', 'add_cookie', [cookie])
+
+    def set_page_load_timeout(self, seconds):
+        return self._next('driver', 'set_page_load_timeout', [seconds])
+
+    def set_window_size(self, width, height):
+        return self._next('driver', 'set_window_size', [width, height])
+
+    def quit(self):
+        pass
+
+
+class ReplayElement:
+    """Element handle from a trace; its commands are answered by the ReplayDriver"""
+
+    def __init__(self, replay, element_id):
+        self._replay = replay
+        self.id = element_id
+
+    def _next(self, command, *args):
+        return self._replay._next(self.id, command, args)
+
+    def click(self):
+        return self._next('click')
+
+    def clear(self):
+        return self._next('clear')
+
+    def send_keys(self, *value):
+        return self._next('send_keys', *value)
+
+    def is_displayed(self):
+        return self._next('is_displayed')
+
+    def is_enabled(self):
+        return self._next('is_enabled')
+
+    def get_attribute(self, name):
+        return self._next('get_attribute', name)
+
+    def find_element(self, by=By.ID, value=None):
+        return self._next('find_element', by, value)
+
+    def find_elements(self, by=By.ID, value=None):
+        return self._next('find_elements', by, value)
+
+    @property
+    def text(self):
+        return self._next('text')
+
+    @property
+    def location(self):
+        return self._next('location')
+
+
+def trace_segment(method):
+    """Mark a bot method as a replayable segment when the driver is traced"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        mark = getattr(self.driver, 'mark', None)
+        if mark is None:
+            return method(self, *args, **kwargs)
+        mark('enter', method.__name__)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            mark('exit', method.__name__)
+    return wrapper
+
+
 class DiscourseAutoRead:
-    def __init__(self, url, username=None, password=None, cookie_str=None):
+    # Route through Discourse's own router (DiscourseURL.routeTo) when the
+    # Ember app is booted on this origin; returns false to fall back to driver.get
+    SPA_ROUTE_SCRIPT = """
+        var path = arguments[0], origin = arguments[1];
+        if (location.origin !== origin || !document.querySelector('#main-outlet')) {
+            return false;
+        }
+        try {
+            var DiscourseURL = window.require('discourse/lib/url').default;
+            DiscourseURL.routeTo(path);
+            return true;
+        } catch (e) {
+            return false;
+        }
+    """
+    # True once the route has changed and a topic list (not the suggested
+    # topics under a post) is rendered
+    TOPIC_LIST_READY_SCRIPT = """
+        if (location.pathname !== arguments[0]) {
+            return false;
+        }
+        var lists = document.querySelectorAll('.topic-list');
+        for (var i = 0; i < lists.length; i++) {
+            if (!lists[i].closest('.suggested-topics, .more-topics__container, #suggested-topics')) {
+                return true;
+            }
+        }
+        return false;
+    """
+
+    # Count resources served from the HTTP cache in the current document
+    # (a revalidated 304 transfers less than the body it reuses)
+    ASSET_CACHE_SCRIPT = """
+        var result = {origin: performance.timeOrigin, hits: 0, misses: 0, saved: 0, transferred: 0};
+        var entries = performance.getEntriesByType('resource');
+        for (var i = 0; i < entries.length; i++) {
+            var e = entries[i];
+            if (!e.decodedBodySize) {
+                continue;  // cross-origin without timing data
+            }
+            if (e.transferSize < e.encodedBodySize) {
+                result.hits++;
+                result.saved += e.encodedBodySize - e.transferSize;
+            } else {
+                result.misses++;
+                result.transferred += e.transferSize;
+            }
+        }
+        return result;
+    """
+
+    def __init__(self, url, username=None, password=None, cookie_str=None, budget=None):
         self.url = url.rstrip('/')
         self.username = username
         self.password = password
         self.cookie_str = cookie_str
         self.driver = None
+        self.trace = None
+        self.command_stats = None
+        # Browser-free HTTP session kept in sync with the driver's cookies
+        self.session = SessionBridge(self.url)
+        if cookie_str:
+            self.session.load_cookie_string(cookie_str)
+        # Wall-clock budget for this site (unlimited unless one is passed in)
+        self.budget = budget or RunBudget().allocate_site(self.url, 1)
+        # Topics that keep failing are backed off, then skipped
+        self.quarantine = TopicQuarantine(
+            self.url,
+            max_failures=int(os.getenv('TOPIC_MAX_FAILURES', 3)),
+            backoff=int(os.getenv('TOPIC_RETRY_BACKOFF', 30)),
+            path=os.getenv('QUARANTINE_FILE') or None,
+            ttl_days=int(os.getenv('QUARANTINE_TTL_DAYS', 7))
+        )
         # Statistics tracking
         self.stats = {
             'unread_topics': 0,
             'new_topics': 0,
             'total_likes': 0,
-            'tunehub_checkin': None  # None: not attempted, True: success, False: failed
+            'tunehub_checkin': None,  # None: not attempted, True: success, False: failed
+            'budget_wound_down': self.budget.wound_down,
+            'quarantine': self.quarantine.summary(),
+            'navigation': {},  # 'spa'/'full' -> {'count', 'total_s'}
+            'asset_cache': {'hits': 0, 'misses': 0, 'bytes_saved': 0, 'bytes_transferred': 0}
         }
+        self.measured_documents = set()
 
     def start(self):
         """Main entry point"""
         try:
-            # Setup Chrome options
-            options = uc.ChromeOptions()
-            
-            headless = os.getenv('HEADLESS', 'true').lower() == 'true'
-            if headless:
-                options.add_argument('--headless=new')
-            
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-gpu')
-            options.add_argument('--window-size=1920,1080')
-            options.add_argument('--disable-blink-features=AutomationControlled')
-            options.add_argument('--disable-infobars')
-            options.add_argument('--disable-extensions')
-            options.add_argument('--disable-popup-blocking')
-            options.add_argument('--start-maximized')
-            options.add_argument('--lang=zh-CN,zh,en-US,en')
-            
-            logger.info("Launching undetected Chrome (v143)...")
-            self.driver = uc.Chrome(
-                options=options,
-                use_subprocess=True,
-                version_main=143
-            )
-            self.driver.set_page_load_timeout(60)
+            self.preflight_session()
             
-            user_agent = self.driver.execute_script("return navigator.userAgent")
-            logger.info(f"User-Agent: {user_agent}")
+            self.launch_browser()
             
             # Perform login
             if self.username and self.password:
@@ -78,6 +1158,10 @@ class DiscourseAutoRead:
             else:
                 raise Exception("No authentication method provided")
             
+            # Share the logged-in browser state with the HTTP session
+            self.session.pull_from_driver(self.driver)
+            self.record_asset_cache()
+            
             # Read unread posts
             self.read_posts()
             
@@ -85,43 +1169,19 @@ class DiscourseAutoRead:
             self.read_new_posts()
             
         except Exception as e:
-            logger.error(f"Error: {e}")
+            logger.error("Error: %s", e)
             raise
         finally:
+            self.finish_session()
             if self.driver:
                 self.driver.quit()
 
     def start_without_quit(self):
         """Main entry point - keeps browser open for subsequent operations"""
         try:
-            # Setup Chrome options
-            options = uc.ChromeOptions()
-            
-            headless = os.getenv('HEADLESS', 'true').lower() == 'true'
-            if headless:
-                options.add_argument('--headless=new')
-            
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-gpu')
-            options.add_argument('--window-size=1920,1080')
-            options.add_argument('--disable-blink-features=AutomationControlled')
-            options.add_argument('--disable-infobars')
-            options.add_argument('--disable-extensions')
-            options.add_argument('--disable-popup-blocking')
-            options.add_argument('--start-maximized')
-            options.add_argument('--lang=zh-CN,zh,en-US,en')
-            
-            logger.info("Launching undetected Chrome (v143)...")
-            self.driver = uc.Chrome(
-                options=options,
-                use_subprocess=True,
-                version_main=143
-            )
-            self.driver.set_page_load_timeout(60)
+            self.preflight_session()
             
-            user_agent = self.driver.execute_script("return navigator.userAgent")
-            logger.info(f"User-Agent: {user_agent}")
+            self.launch_browser()
             
             # Perform login
             if self.username and self.password:
@@ -131,6 +1191,10 @@ class DiscourseAutoRead:
             else:
                 raise Exception("No authentication method provided")
             
+            # Share the logged-in browser state with the HTTP session
+            self.session.pull_from_driver(self.driver)
+            self.record_asset_cache()
+            
             # Read unread posts
             self.read_posts()
             
@@ -141,15 +1205,110 @@ class DiscourseAutoRead:
             logger.info("Forum tasks completed. Browser kept alive for TuneHub check-in.")
             
         except Exception as e:
-            logger.error(f"Error: {e}")
+            logger.error("Error: %s", e)
+            self.finish_session()
             if self.driver:
                 self.driver.quit()
             raise
 
+    def launch_browser(self):
+        """Start Chrome with the CHROME_PRESET launch configuration"""
+        preset = os.getenv('CHROME_PRESET', 'default')
+        headless = os.getenv('HEADLESS', 'true').lower() == 'true'
+        options = build_chrome_options(preset, headless, extra_args=self.asset_cache_args())
+        
+        logger.info("Launching undetected Chrome (v143, preset: %s)...", preset)
+        self.driver = self.wrap_driver(uc.Chrome(
+            options=options,
+            use_subprocess=True,
+            version_main=143
+        ))
+        self.driver.set_page_load_timeout(60)
+        window_size = CHROME_PRESETS[preset]['window_size']
+        if window_size:
+            self.driver.set_window_size(*window_size)
+        
+        user_agent = self.driver.execute_script("return navigator.userAgent")
+        logger.info("User-Agent: %s", user_agent)
+
+    def preflight_session(self):
+        """Verify cookie login over HTTP before paying for a browser launch"""
+        if (self.username and self.password) or not self.cookie_str:
+            return
+        
+        logger.info("Checking cookie session via /session/current.json...")
+        logged_in = self.session.check_session()
+        if logged_in is False:
+            raise Exception("Cookie login failed: session rejected before launching browser")
+        if logged_in:
+            logger.info("Cookie session is valid.")
+
+    def wrap_driver(self, driver):
+        """Attach command accounting (COMMAND_STATS) and trace recording (DRIVER_TRACE)"""
+        observers = []
+        if os.getenv('COMMAND_STATS', 'true').lower() == 'true':
+            self.command_stats = CommandStats()
+            observers.append(self.command_stats)
+        
+        trace_path = os.getenv('DRIVER_TRACE')
+        if trace_path:
+            # Keep the loop limits and quarantine settings so replays take the same
+            # branches; budget and quarantine state are stored on each segment
+            env = {
+                name: os.getenv(name)
+                for name in ('MAX_TOPICS', 'MAX_NEW_TOPICS', 'TOPIC_MAX_FAILURES', 'TOPIC_RETRY_BACKOFF')
+                if os.getenv(name)
+            }
+            self.trace = TraceRecorder(
+                trace_path.format(host=self.session.host), self.url, env, state=self.replay_state
+            )
+            logger.info("Recording WebDriver trace to %s", self.trace.path)
+            observers.append(self.trace)
+        
+        return DriverProxy(driver, observers=observers) if observers else driver
+
+    def replay_state(self):
+        """Run state that decides which topics a segment opens"""
+        return {'budget': self.budget.snapshot(), 'quarantine': self.quarantine.snapshot()}
+
+    def restore_replay_state(self, state):
+        self.budget.restore(state['budget'])
+        self.quarantine.restore(state['quarantine'])
+
+    def report_commands(self):
+        """Log the command accounting table and check the per-topic budget"""
+        if not self.command_stats:
+            return
+        stats = self.command_stats
+        topics = self.stats['unread_topics'] + self.stats['new_topics']
+        per_topic = stats.per_topic(topics)
+        self.stats['commands'] = {'total': stats.total, 'per_topic': per_topic, 'table': stats.table()}
+        if self.trace:
+            self.trace.accounting = self.stats['commands']
+        
+        logger.info("WebDriver commands: %s total, %s per topic", stats.total, per_topic)
+        for line in stats.format_table(limit=int(os.getenv('COMMAND_STATS_ROWS', 20))):
+            logger.info("%s", line)
+        
+        budget = int(os.getenv('MAX_COMMANDS_PER_TOPIC', 0))
+        if budget and per_topic and per_topic > budget:
+            logger.warning("WebDriver commands per topic (%s) exceed budget of %s", per_topic, budget)
+
+    def finish_session(self):
+        """Record end-of-run metrics and release pooled connections"""
+        self.report_commands()
+        if self.trace:
+            self.trace.save()
+        self.log_navigation_stats()
+        self.log_asset_cache_stats()
+        self.stats['session_bridge'] = self.session.metrics_summary()
+        self.session.log_metrics()
+        self.session.close()
+
     def login_with_credentials(self):
         """Login using username and password"""
         login_url = f"{self.url}/login"
-        logger.info(f"Navigating to {login_url}...")
+        logger.info("Navigating to %s...", login_url)
         self.driver.get(login_url)
         
         time.sleep(5)
@@ -164,7 +1323,7 @@ class DiscourseAutoRead:
             
             username_field.clear()
             username_field.send_keys(self.username)
-            logger.info(f"Filled username: {self.username[:3]}***")
+            logger.info("Filled username: %s***", self.username[:3])
             time.sleep(0.5)
             
             password_field = self.driver.find_element(By.ID, "login-account-password")
@@ -178,7 +1337,7 @@ class DiscourseAutoRead:
             logger.info("Clicked login button.")
             
             login_timeout = int(os.getenv('LOGIN_TIMEOUT', '60'))
-            logger.info(f"Waiting for login (timeout: {login_timeout}s)...")
+            logger.info("Waiting for login (timeout: %ss)...", login_timeout)
             
             time.sleep(3)
             self.handle_cloudflare()
@@ -191,7 +1350,7 @@ class DiscourseAutoRead:
                 raise Exception("Login failed: timeout waiting for user avatar")
                 
         except Exception as e:
-            logger.error(f"Login failed: {e}")
+            logger.error("Login failed: %s", e)
             raise
 
     def login_with_cookies(self):
@@ -202,16 +1361,9 @@ class DiscourseAutoRead:
         time.sleep(3)
         self.handle_cloudflare()
         
-        for chunk in self.cookie_str.split(';'):
-            if '=' in chunk:
-                name, value = chunk.strip().split('=', 1)
-                if name and value:
-                    try:
-                        self.driver.add_cookie({'name': name, 'value': value})
-                    except Exception as e:
-                        logger.warning(f"Failed to add cookie {name}: {e}")
+        pushed = self.session.push_to_driver(self.driver)
         
-        logger.info("Cookies added. Refreshing page...")
+        logger.info("%s cookies added. Refreshing page...", pushed)
         self.driver.refresh()
         time.sleep(3)
         self.handle_cloudflare()
@@ -236,32 +1388,30 @@ class DiscourseAutoRead:
                     if "Just a moment" not in new_title and "Cloudflare" not in new_title:
                         logger.info("Cloudflare challenge passed!")
                         return
-                    logger.info(f"Still waiting for Cloudflare... ({i+1}/30)")
+                    logger.info("Still waiting for Cloudflare... (%s/30)", i+1, extra=THROTTLED)
                 
                 logger.warning("Cloudflare challenge timeout")
         except Exception as e:
-            logger.info(f"Cloudflare check: {e}")
+            logger.info("Cloudflare check: %s", e)
 
+    @trace_segment
     def read_posts(self):
         """Read unread posts"""
         logger.info("Starting to read posts...")
         
         max_topics = int(os.getenv('MAX_TOPICS', 10))
+        max_new_topics = int(os.getenv('MAX_NEW_TOPICS', 20))
         count = 0
         
+        # Unread topics get their share of the site time; leftovers go to /new
+        self.budget.begin_phase('unread', max_topics / max(max_topics + max_new_topics, 1))
+        
         while count < max_topics:
-            target_page = f"{self.url}/unread"
-            logger.info(f"Navigating to {target_page}")
-            self.driver.get(target_page)
-            
-            time.sleep(3)
-            self.handle_cloudflare()
-            
-            try:
-                wait = WebDriverWait(self.driver, 15)
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".topic-list")))
-                logger.info("Topic list loaded.")
-            except TimeoutException:
+            if not self.budget.can_start_topic():
+                logger.info("Time budget running out, stopping unread topics.")
+                break
+            topic_started = time.monotonic()
+            if not self.open_topic_list('/unread'):
                 logger.warning("No topic list found.")
                 break
             
@@ -270,48 +1420,55 @@ class DiscourseAutoRead:
                 logger.info("No more unread topics. All caught up!")
                 break
             
-            logger.info(f"Reading topic ({count+1}/{max_topics})...")
+            logger.info("Reading topic (%s/%s)...", count+1, max_topics)
             
+            topic_url = None
             try:
+                topic_url = badge.get_attribute('href')
                 badge.click()
                 time.sleep(2)
                 
                 if self.check_topic_error():
                     logger.error("Topic load error detected")
+                    self.quarantine.record_failure(
+                        self.quarantine.topic_key(topic_url), topic_url, time.monotonic() - topic_started
+                    )
                     continue
                 
                 self.simulate_reading()
+                self.quarantine.record_success(self.quarantine.topic_key(topic_url))
+                self.budget.record_topic(time.monotonic() - topic_started)
                 count += 1
                 self.stats['unread_topics'] = count
-                logger.info(f"Finished reading topic {count}/{max_topics}")
+                logger.info("Finished reading topic %s/%s", count, max_topics)
                 
             except Exception as e:
-                logger.error(f"Failed to read topic: {e}")
+                logger.error("Failed to read topic: %s", e)
+                self.quarantine.record_failure(
+                    self.quarantine.topic_key(topic_url), topic_url, time.monotonic() - topic_started
+                )
                 continue
         
-        logger.info(f"Completed reading {count} topics.")
+        self.update_quarantine()
+        logger.info("Completed reading %s topics.", count)
 
+    @trace_segment
     def read_new_posts(self):
         """Read new posts from /new page"""
         max_new_topics = int(os.getenv('MAX_NEW_TOPICS', 20))
-        logger.info(f"Starting to read new posts (max: {max_new_topics})...")
+        logger.info("Starting to read new posts (max: %s)...", max_new_topics)
         
         count = 0
         visited_urls = set()
         
+        self.budget.begin_phase('new', 1.0)
+        
         while count < max_new_topics:
-            target_page = f"{self.url}/new"
-            logger.info(f"Navigating to {target_page}")
-            self.driver.get(target_page)
-            
-            time.sleep(3)
-            self.handle_cloudflare()
-            
-            try:
-                wait = WebDriverWait(self.driver, 15)
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".topic-list")))
-                logger.info("Topic list loaded.")
-            except TimeoutException:
+            if not self.budget.can_start_topic():
+                logger.info("Time budget running out, stopping new topics.")
+                break
+            topic_started = time.monotonic()
+            if not self.open_topic_list('/new'):
                 logger.warning("No topic list found on /new page.")
                 break
             
@@ -322,9 +1479,10 @@ class DiscourseAutoRead:
                 break
             
             topic_url = topic_link.get_attribute('href')
+            topic_key = self.quarantine.topic_key(topic_url)
             visited_urls.add(topic_url)
             
-            logger.info(f"Reading new topic ({count+1}/{max_new_topics})...")
+            logger.info("Reading new topic (%s/%s)...", count+1, max_new_topics)
             
             try:
                 topic_link.click()
@@ -332,18 +1490,138 @@ class DiscourseAutoRead:
                 
                 if self.check_topic_error():
                     logger.error("Topic load error detected")
+                    self.fail_new_topic(topic_key, topic_url, topic_started, visited_urls)
                     continue
                 
                 self.simulate_reading()
+                self.quarantine.record_success(topic_key)
+                self.budget.record_topic(time.monotonic() - topic_started)
                 count += 1
                 self.stats['new_topics'] = count
-                logger.info(f"Finished reading new topic {count}/{max_new_topics}")
+                logger.info("Finished reading new topic %s/%s", count, max_new_topics)
                 
             except Exception as e:
-                logger.error(f"Failed to read new topic: {e}")
+                logger.error("Failed to read new topic: %s", e)
+                self.fail_new_topic(topic_key, topic_url, topic_started, visited_urls)
                 continue
         
-        logger.info(f"Completed reading {count} new topics.")
+        self.update_quarantine()
+        logger.info("Completed reading %s new topics.", count)
+
+    def open_topic_list(self, path):
+        """Open a topic list, routing inside the Ember app when possible"""
+        started = time.monotonic()
+        
+        if self.route_in_app(path):
+            try:
+                WebDriverWait(self.driver, 10, ignored_exceptions=(WebDriverException,)).until(
+                    lambda d: d.execute_script(self.TOPIC_LIST_READY_SCRIPT, path)
+                )
+                self.record_navigation('spa', time.monotonic() - started)
+                logger.info("Topic list loaded (in-app navigation to %s).", path)
+                return True
+            except TimeoutException:
+                logger.info("In-app navigation to %s timed out, reloading page.", path)
+        
+        target_page = f"{self.url}{path}"
+        logger.info("Navigating to %s", target_page)
+        self.driver.get(target_page)
+        
+        time.sleep(1)
+        self.handle_cloudflare()
+        
+        try:
+            wait = WebDriverWait(self.driver, 15)
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".topic-list")))
+        except TimeoutException:
+            return False
+        self.record_navigation('full', time.monotonic() - started)
+        self.record_asset_cache()
+        logger.info("Topic list loaded.")
+        return True
+
+    def route_in_app(self, path):
+        """Ask Discourse's router to transition to `path`; False if the app isn't available"""
+        try:
+            return bool(self.driver.execute_script(self.SPA_ROUTE_SCRIPT, path, self.url))
+        except Exception:
+            return False
+
+    def record_navigation(self, kind, seconds):
+        nav = self.stats['navigation'].setdefault(kind, {'count': 0, 'total_s': 0.0})
+        nav['count'] += 1
+        nav['total_s'] = round(nav['total_s'] + seconds, 2)
+
+    def asset_cache_args(self):
+        """Chrome flags for a per-site disk cache under CHROME_CACHE_DIR, pruned to its cap"""
+        base = os.getenv('CHROME_CACHE_DIR')
+        if not base:
+            return []
+        cache_dir = os.path.abspath(os.path.join(base, self.session.host))
+        max_bytes = int(os.getenv('CHROME_CACHE_MAX_MB', 200)) * 1024 * 1024
+        os.makedirs(cache_dir, exist_ok=True)
+        
+        size, pruned = prune_cache_dir(cache_dir, max_bytes)
+        self.stats['asset_cache'].update({'dir_bytes': size - pruned, 'pruned_bytes': pruned})
+        logger.info("Asset cache %s: %.1f MB (pruned %.1f MB)", cache_dir, (size - pruned) / 1e6, pruned / 1e6)
+        # Chrome evicts on its own above --disk-cache-size; pruning keeps the restored copy bounded too
+        return [f'--disk-cache-dir={cache_dir}', f'--disk-cache-size={max_bytes}']
+
+    def record_asset_cache(self):
+        """Add the current document's cache hits and bytes saved to the stats"""
+        try:
+            usage = self.driver.execute_script(self.ASSET_CACHE_SCRIPT)
+        except Exception as e:
+            logger.info("Asset cache check: %s", e)
+            return
+        if not usage or usage['origin'] in self.measured_documents:
+            return
+        self.measured_documents.add(usage['origin'])
+        cache = self.stats['asset_cache']
+        cache['hits'] += usage['hits']
+        cache['misses'] += usage['misses']
+        cache['bytes_saved'] += usage['saved']
+        cache['bytes_transferred'] += usage['transferred']
+
+    def log_asset_cache_stats(self):
+        cache = self.stats['asset_cache']
+        requests_seen = cache['hits'] + cache['misses']
+        if not requests_seen:
+            return
+        cache['hit_rate'] = round(cache['hits'] / requests_seen, 3)
+        logger.info(
+            "Asset cache: %s/%s hits (%.0f%%), %.1f MB saved, %.1f MB downloaded",
+            cache['hits'], requests_seen, cache['hit_rate'] * 100,
+            cache['bytes_saved'] / 1e6, cache['bytes_transferred'] / 1e6
+        )
+
+    def log_navigation_stats(self):
+        averages = {}
+        for kind, nav in self.stats['navigation'].items():
+            averages[kind] = nav['total_s'] / nav['count']
+            logger.info("Navigation %s: %s loads, avg %.2fs", kind, nav['count'], averages[kind])
+        if 'spa' in averages and 'full' in averages:
+            logger.info("In-app navigation saved %.2fs per topic list load", averages['full'] - averages['spa'])
+
+    def fail_new_topic(self, topic_key, topic_url, topic_started, visited_urls):
+        """Record a failed /new topic and allow a retry once its backoff expires"""
+        self.quarantine.record_failure(topic_key, topic_url, time.monotonic() - topic_started)
+        visited_urls.discard(topic_url)
+
+    def update_quarantine(self):
+        """Refresh quarantine stats and persist them"""
+        self.stats['quarantine'] = self.quarantine.summary()
+        self.quarantine.save()
+
+    def is_topic_skipped(self, elem):
+        """Check whether a topic link or badge points at a backed-off/quarantined topic"""
+        if not self.quarantine.topics:
+            return False
+        try:
+            href = elem.get_attribute('href')
+        except Exception:
+            return True  # stale or unreadable, try the next one
+        return self.quarantine.should_skip(self.quarantine.topic_key(href))
 
     def get_first_new_topic(self, visited_urls):
         """Find the first unvisited topic link on /new page"""
@@ -353,11 +1631,13 @@ class DiscourseAutoRead:
             )
             for link in topic_links:
                 href = link.get_attribute('href')
-                if href and href not in visited_urls and link.is_displayed():
-                    logger.info(f"Found new topic: {link.text[:50]}...")
+                if (href and href not in visited_urls
+                        and not self.quarantine.should_skip(self.quarantine.topic_key(href))
+                        and link.is_displayed()):
+                    logger.info("Found new topic: %s...", link.text[:50])
                     return link
         except Exception as e:
-            logger.error(f"Error finding new topic: {e}")
+            logger.error("Error finding new topic: %s", e)
         return None
 
     def get_first_unread_badge(self):
@@ -373,8 +1653,8 @@ class DiscourseAutoRead:
             try:
                 elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
                 for elem in elements:
-                    if elem.is_displayed():
-                        logger.info(f"Found unread badge: {selector}")
+                    if elem.is_displayed() and not self.is_topic_skipped(elem):
+                        logger.info("Found unread badge: %s", selector)
                         return elem
             except Exception:
                 continue
@@ -384,7 +1664,7 @@ class DiscourseAutoRead:
                 By.CSS_SELECTOR, ".topic-list-item a.badge-notification"
             )
             for elem in elements:
-                if elem.is_displayed():
+                if elem.is_displayed() and not self.is_topic_skipped(elem):
                     return elem
         except Exception:
             pass
@@ -411,7 +1691,7 @@ class DiscourseAutoRead:
         scroll_step = min(400, viewport_height - 100)
         
         start_time = time.time()
-        max_time = 300
+        max_time = self.budget.topic_time_cap(300)
         bottom_count = 0
         
         while (time.time() - start_time) < max_time:
@@ -474,10 +1754,11 @@ class DiscourseAutoRead:
         
         return like_containers
 
+    @trace_segment
     def random_like(self):
         """Random like 2-3 posts during reading"""
         like_count = random.randint(2, 3)
-        logger.info(f"Attempting to like {like_count} posts...")
+        logger.info("Attempting to like %s posts...", like_count)
         
         liked = 0
         liked_positions = set()  # Track positions we've already liked
@@ -497,7 +1778,7 @@ class DiscourseAutoRead:
                     break
                 
                 if liked == 0:
-                    logger.info(f"Found {len(like_containers)} likeable posts.")
+                    logger.info("Found %s likeable posts.", len(like_containers))
                 
                 # Filter out positions we've already tried
                 available = []
@@ -534,17 +1815,18 @@ class DiscourseAutoRead:
                 
                 liked += 1
                 self.stats['total_likes'] += 1
-                logger.info(f"Liked post {liked}/{like_count}")
+                logger.info("Liked post %s/%s", liked, like_count)
                 
                 # Random delay between likes
                 time.sleep(random.uniform(1.0, 2.0))
                 
             except Exception as e:
-                logger.warning(f"Failed to like post: {e}")
+                logger.warning("Failed to like post: %s", e)
                 continue
         
-        logger.info(f"Successfully liked {liked} posts.")
+        logger.info("Successfully liked %s posts.", liked)
 
+    @trace_segment
     def tunehub_checkin(self):
         """Perform TuneHub daily check-in using Linux DO SSO"""
         logger.info("Starting TuneHub check-in...")
@@ -553,7 +1835,7 @@ class DiscourseAutoRead:
 
         try:
             # Step 1: Navigate to TuneHub login page
-            logger.info(f"Navigating to {tunehub_login_url}...")
+            logger.info("Navigating to %s...", tunehub_login_url)
             self.driver.get(tunehub_login_url)
             time.sleep(3)
 
@@ -615,12 +1897,12 @@ class DiscourseAutoRead:
                     By.XPATH, "//*[@id='app']/section/main/div/div[2]/div[1]/div/div/div/div[2]/span"
                 )
                 current_points = points_element.text.strip()
-                logger.info(f"Current points before check-in: {current_points}")
+                logger.info("Current points before check-in: %s", current_points)
             except Exception:
                 try:
                     points_element = self.driver.find_element(By.XPATH, "//span[contains(@class, 'points') or ancestor::div[contains(text(), '积分')]]")
                     current_points = points_element.text.strip()
-                    logger.info(f"Current points before check-in: {current_points}")
+                    logger.info("Current points before check-in: %s", current_points)
                 except Exception:
                     logger.warning("Could not get current points")
 
@@ -650,7 +1932,7 @@ class DiscourseAutoRead:
                         self.driver.execute_script("arguments[0].click();", checkin_button)
                     checkin_clicked = True
                 except Exception as e:
-                    logger.warning(f"Could not find check-in button: {e}")
+                    logger.warning("Could not find check-in button: %s", e)
                     return True
 
             if not checkin_clicked:
@@ -679,13 +1961,13 @@ class DiscourseAutoRead:
                         By.XPATH, "//*[contains(text(), '签到成功')]"
                     )
                     if success_msg.is_displayed():
-                        logger.info(f"Check-in success message: {success_msg.text}")
+                        logger.info("Check-in success message: %s", success_msg.text)
                         success_detected = True
                         break
                 except Exception:
                     pass
 
-                logger.info(f"Waiting for check-in response... ({attempt + 1}/10)")
+                logger.info("Waiting for check-in response... (%s/10)", attempt + 1, extra=THROTTLED)
 
             time.sleep(2)
 
@@ -706,10 +1988,10 @@ class DiscourseAutoRead:
                     By.XPATH, "//*[@id='app']/section/main/div/div[2]/div[1]/div/div/div/div[2]/span"
                 )
                 new_points = points_element.text.strip()
-                logger.info(f"Points after check-in: {new_points}")
+                logger.info("Points after check-in: %s", new_points)
 
                 if current_points != "unknown" and new_points != current_points:
-                    logger.info(f"Check-in successful! Points changed: {current_points} -> {new_points}")
+                    logger.info("Check-in successful! Points changed: %s -> %s", current_points, new_points)
                 elif success_detected:
                     logger.info("Check-in completed (success message was shown)")
                 else:
@@ -724,7 +2006,7 @@ class DiscourseAutoRead:
             return True
 
         except Exception as e:
-            logger.error(f"TuneHub check-in failed: {e}")
+            logger.error("TuneHub check-in failed: %s", e)
             return False
 
 
@@ -759,18 +2041,30 @@ def send_pushplus_notification(total_stats, site_details):
         f"<tr><td>总阅读</td><td>{total_posts}</td></tr>",
         f"<tr><td>总点赞</td><td>{total_likes}</td></tr>",
         f"<tr><td>TuneHub签到</td><td>{tunehub_text}</td></tr>",
-        "</table>",
     ]
     
+    budget = total_stats.get('budget')
+    if budget:
+        deadline_text = f" / {budget['deadline_s']}s" if budget['deadline_s'] else ""
+        content_parts.append(f"<tr><td>运行用时</td><td>{budget['elapsed_s']}s{deadline_text}</td></tr>")
+    content_parts.append("</table>")
+    
     if site_details:
         content_parts.append("<h2>📋 站点详情</h2>")
         for site in site_details:
             site_posts = site['unread_topics'] + site['new_topics']
-            content_parts.append(
+            site_text = (
                 f"<p><b>{site['url']}</b><br>"
                 f"阅读: {site_posts} (未读{site['unread_topics']} + 新帖{site['new_topics']}), "
-                f"点赞: {site['total_likes']}</p>"
+                f"点赞: {site['total_likes']}"
             )
+            quarantined = site.get('quarantine', {}).get('quarantined')
+            if quarantined:
+                topics = ', '.join(f"#{t['topic']}({t['lost_s']}s)" for t in quarantined)
+                site_text += f"<br>🚫 隔离帖子: {topics}，本次失败耗时 {site['quarantine']['lost_s']}s"
+            if site.get('budget_wound_down'):
+                site_text += f"<br>⏱️ 时间预算不足，提前结束: {', '.join(site['budget_wound_down'])}"
+            content_parts.append(site_text + "</p>")
     
     content = ''.join(content_parts)
     
@@ -787,11 +2081,11 @@ def send_pushplus_notification(total_stats, site_details):
             if result.get('code') == 200:
                 logger.info("PushPlus notification sent successfully!")
             else:
-                logger.warning(f"PushPlus notification failed: {result.get('msg')}")
+                logger.warning("PushPlus notification failed: %s", result.get('msg'))
         else:
-            logger.warning(f"PushPlus request failed: HTTP {response.status_code}")
+            logger.warning("PushPlus request failed: HTTP %s", response.status_code)
     except Exception as e:
-        logger.error(f"Failed to send PushPlus notification: {e}")
+        logger.error("Failed to send PushPlus notification: %s", e)
 
 
 def main():
@@ -821,8 +2115,19 @@ def main():
     total_stats = {'unread_topics': 0, 'new_topics': 0, 'total_likes': 0, 'tunehub_checkin': None}
     site_details = []
     
-    for cfg in configs:
-        logger.info(f"Starting auto-read for: {cfg['url']}")
+    # Global deadline split across sites; the reserve covers TuneHub and the notification
+    budget = RunBudget(
+        total_seconds=int(os.getenv('RUN_DEADLINE', 0)),
+        reserve_seconds=int(os.getenv('RUN_RESERVE', 180))
+    )
+    
+    for index, cfg in enumerate(configs):
+        if budget.remaining() - budget.reserve <= 0:
+            logger.warning("Run deadline reached, skipping %s", cfg['url'])
+            budget.record(cfg['url'], 'site_skipped')
+            continue
+        
+        logger.info("Starting auto-read for: %s", cfg['url'])
         is_linux_do = 'linux.do' in cfg['url'].lower()
         
         try:
@@ -830,7 +2135,8 @@ def main():
                 url=cfg['url'],
                 username=cfg.get('username'),
                 password=cfg.get('password'),
-                cookie_str=cfg.get('cookie')
+                cookie_str=cfg.get('cookie'),
+                budget=budget.allocate_site(cfg['url'], len(configs) - index)
             )
             
             if is_linux_do:
@@ -841,14 +2147,16 @@ def main():
                 try:
                     logger.info("=" * 50)
                     logger.info("Proceeding to TuneHub check-in using Linux DO session...")
+                    budget.record('tunehub', 'started', remaining_s=round(budget.remaining()) if budget.total else None)
                     checkin_result = bot.tunehub_checkin()
                     bot.stats['tunehub_checkin'] = checkin_result
                     total_stats['tunehub_checkin'] = checkin_result
                 except Exception as e:
-                    logger.error(f"TuneHub check-in error: {e}")
+                    logger.error("TuneHub check-in error: %s", e)
                     bot.stats['tunehub_checkin'] = False
                     total_stats['tunehub_checkin'] = False
                 finally:
+                    bot.finish_session()
                     if bot.driver:
                         bot.driver.quit()
                         logger.info("Linux DO browser closed.")
@@ -867,7 +2175,9 @@ def main():
             })
             
         except Exception as e:
-            logger.error(f"Error processing {cfg['url']}: {e}")
+            logger.error("Error processing %s: %s", cfg['url'], e)
+    
+    total_stats['budget'] = budget.summary()
     
     # Send notification after all sites are processed
     send_pushplus_notification(total_stats, site_details)